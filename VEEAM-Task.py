@@ -1,18 +1,251 @@
 # For synchronization of two folders
 import os
 import shutil
+import stat
+
+# For fast copies of file contents
+import errno
+import sys
+import ctypes
+import tempfile
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# For content comparison of files (--checksum)
+import hashlib
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+# For the index of the synchronized state, kept between synchronizations
+import json
 
 # For log file creation/copying/removal operations
 import logging
+import logging.handlers
+import queue
+import atexit
+import signal
+import functools
+
+# For parallel synchronization of folders
+import concurrent.futures
 
 # For periodical synchronization
 import sched
 import time
 
+# For change notifications of the source folder (--watch, Linux only) and fast listing of
+# folders (macOS only)
+import select
+import struct
+import collections
+
 # For command line arguments
 import argparse
 
 
+# Logger of the synchronization (its records are handled by the handlers set up by setup_logging)
+logger = logging.getLogger(__name__)
+
+# Folders with more files to copy than this have them copied in parallel (for fewer files,
+# the overhead of the thread pool isn't worth it)
+PARALLEL_THRESHOLD = 4
+
+# Errors meaning that a zero-copy syscall isn't supported for the given files (e.g. files on
+# different filesystems), in which case the next copy method is tried
+COPY_FALLBACK_ERRORS = (errno.EXDEV, errno.ENOTSUP, errno.EOPNOTSUPP, errno.ENOSYS, errno.EINVAL, errno.ENOTSOCK,
+                        errno.ENOTTY)
+
+# ioctl making a file share the blocks of another one (a reflink), on filesystems such as
+# Btrfs or XFS (Linux only)
+FICLONE = 0x40049409 if sys.platform.startswith('linux') and fcntl else None
+
+# Size of the chunks copied at a time when files have to be read and written from user space
+COPY_BUFFER_SIZE = 64 * 1024
+
+# Size of the buffer used to copy files larger than it when the content can't be copied by
+# the kernel (bigger transfers keep the disk busy with fewer system calls)
+LARGE_COPY_BUFFER_SIZE = 1024 * 1024
+
+# Avoids updating the access time of source files while they are copied (Linux only)
+O_NOATIME = getattr(os, 'O_NOATIME', 0)
+
+# Name of the index file, kept at the root of the replica folder, where the state of the source
+# folder found by the last synchronization is saved (so that it survives restarts)
+INDEX_FILE_NAME = '.veeam-index'
+
+# Hash used to compare files by content: BLAKE3 if the blake3 module is installed, otherwise
+# SHA-256 (which OpenSSL computes with the SHA instructions of the CPU, where available).
+# Digests are prefixed with its name, so that digests saved with another hash never match
+DIGEST_HASH = blake3.blake3 if blake3 else hashlib.sha256
+DIGEST_PREFIX = ('blake3' if blake3 else 'sha256') + ':'
+
+# State of the source folder found by the last synchronization: for each folder (by its path
+# relative to the source folder), the (size, modification time, permission bits) of each of
+# its files (plus their digest, if they are compared by content), or None for each of its
+# subfolders. It is None until loaded from the index file
+last_source_state = None
+
+# Methods used to copy the content of files, in the order they are tried (see setup_backend).
+# It is None until the source and replica folders are probed
+copy_methods = None
+
+# inotify flags (from <sys/inotify.h>) used to watch the source folder for changes (--watch)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_ONLYDIR = 0x01000000
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_CLOEXEC = 0o2000000
+WATCH_EVENTS = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+# Without --watch, the replica folder is fully compared against the source folder (instead of
+# trusting the state found by the last synchronization) on the first synchronization, since it
+# may have been changed while the program wasn't running, and then once every this many
+# synchronizations, in case it was changed by something else
+FULL_COMPARE_INTERVALS = 10
+
+# With --watch, the whole source folder is still synchronized once every this many intervals,
+# in case some change was missed (e.g. if the inotify event queue overflowed) or the replica
+# folder was changed by something else (so the replica folder is fully compared then)
+WATCH_RECONCILE_INTERVALS = 10
+
+# With --watch, time (in seconds) during which events are gathered before the changed entries
+# are synchronized, so that a burst of events (e.g. a file being written) is handled at once
+WATCH_SETTLE_TIME = 0.5
+
+# getattrlistbulk attributes and options (from <sys/attr.h>) used to list folders on macOS,
+# together with the types of file system objects (from <sys/vnode.h>)
+ATTR_BIT_MAP_COUNT = 5
+ATTR_CMN_NAME = 0x00000001
+ATTR_CMN_OBJTYPE = 0x00000008
+ATTR_CMN_MODTIME = 0x00000400
+ATTR_CMN_ACCTIME = 0x00001000
+ATTR_CMN_ACCESSMASK = 0x00020000
+ATTR_CMN_RETURNED_ATTRS = 0x80000000
+ATTR_FILE_DATALENGTH = 0x00000200
+FSOPT_PACK_INVAL_ATTRS = 0x00000008
+VREG = 1
+VDIR = 2
+VBLK = 3
+VCHR = 4
+VLNK = 5
+VSOCK = 6
+VFIFO = 7
+
+# File type bits of the stat result of each type of file system object (other types are left
+# without any, so they are never taken for regular files)
+VNODE_FILE_TYPES = {VREG: stat.S_IFREG, VDIR: stat.S_IFDIR, VBLK: stat.S_IFBLK, VCHR: stat.S_IFCHR,
+                    VLNK: stat.S_IFLNK, VSOCK: stat.S_IFSOCK, VFIFO: stat.S_IFIFO}
+
+# Whether entries of folders can be accessed (opened, listed, changed and removed) through a
+# file descriptor of the folder (not on Windows, for instance)
+HAVE_DIR_FD = {os.open, os.stat, os.chmod, os.unlink, os.rmdir} <= os.supports_dir_fd and os.scandir in os.supports_fd
+
+# Flags used to open folders, to access their entries through the file descriptor
+DIR_OPEN_FLAGS = os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0)
+
+# Size of the buffer filled by each getattrlistbulk call (enough for some thousands of entries)
+BULK_BUFFER_SIZE = 256 * 1024
+
+# C library, for the functions which aren't wrapped by the os module (inotify functions on
+# Linux, getattrlistbulk on macOS)
+libc = ctypes.CDLL(None, use_errno=True) if sys.platform != 'win32' else None
+
+
+# struct attrlist (from <sys/attr.h>), telling getattrlistbulk which attributes to return
+class AttrList(ctypes.Structure):
+    _fields_ = [('bitmapcount', ctypes.c_ushort), ('reserved', ctypes.c_uint16), ('commonattr', ctypes.c_uint32),
+                ('volattr', ctypes.c_uint32), ('dirattr', ctypes.c_uint32), ('fileattr', ctypes.c_uint32),
+                ('forkattr', ctypes.c_uint32)]
+
+
+# Part of a stat result which is returned by getattrlistbulk (and used by the synchronization)
+BulkStat = collections.namedtuple('BulkStat', ['st_mode', 'st_size', 'st_atime_ns', 'st_mtime_ns'])
+
+
+###########################################################################################
+#                                                                                         #
+# def format_timestamp(seconds)                                                           #
+#                                                                                         #
+# Function to format the timestamp of the log records. Records are only timestamped to    #
+# the second, so the formatted timestamp of each second is cached, instead of formatting  #
+# it again for each record                                                                #
+# Inputs: seconds (time of the record, in seconds since the epoch)                        #
+# Output: formatted timestamp                                                             #
+#                                                                                         #
+# Author: Solange Santos                                                                  #
+# Date: 14/10/2026                                                                        #
+#                                                                                         #
+###########################################################################################
+@functools.lru_cache(maxsize=16)
+def format_timestamp(seconds):
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(seconds))
+
+
+###########################################################################################
+#                                                                                         #
+# class CachedTimeFormatter                                                               #
+#                                                                                         #
+# Class of the formatter of the log records, which formats their timestamps with          #
+# format_timestamp                                                                        #
+#                                                                                         #
+# Author: Solange Santos                                                                  #
+# Date: 14/10/2026                                                                        #
+#                                                                                         #
+###########################################################################################
+class CachedTimeFormatter(logging.Formatter):
+    def formatTime(self, record, datefmt=None):
+        return format_timestamp(int(record.created))
+
+
+###########################################################################################
+#                                                                                         #
+# class AppendFileHandler                                                                 #
+#                                                                                         #
+# Class of the handler writing the log records to the log file. The file is opened once   #
+# in append mode, and each record is encoded to UTF-8 and written with a single os.write  #
+# (instead of going through the buffered text stream used by logging.FileHandler)         #
+#                                                                                         #
+# Author: Solange Santos                                                                  #
+# Date: 14/10/2026                                                                        #
+#                                                                                         #
+###########################################################################################
+class AppendFileHandler(logging.Handler):
+    def __init__(self, log_file):
+        # Open the file before the handler is registered, so that a log file which can't be
+        # opened doesn't leave a handler without a file behind (closed at exit)
+        self.fd = os.open(log_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, 'O_BINARY', 0), 0o644)
+        super().__init__()
+
+    def emit(self, record):
+        try:
+            data = memoryview((self.format(record) + '\n').encode('utf-8'))
+            while data:
+                data = data[os.write(self.fd, data):]
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        self.acquire()
+        try:
+            if self.fd >= 0:
+                os.close(self.fd)
+                self.fd = -1
+        finally:
+            self.release()
+        super().close()
+
+
 ###########################################################################################
 #                                                                                         #
 # def setup_logging(log_file)                                                             #
@@ -27,28 +260,849 @@ import argparse
 #                                                                                         #
 ###########################################################################################
 def setup_logging(log_file):
-    # Ensure log directory exists
+    # Ensure log directory exists (the log file itself is created, if it doesn't exist, when
+    # it is opened in append mode)
     log_dir = os.path.dirname(log_file)
-    if not os.path.exists(log_dir):
-        os.makedirs(log_dir)
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
 
-    # Create log file if it doesn't exist
-    if not os.path.exists(log_file):
-        with open(log_file, 'w'):
-            pass
-
-    logging.basicConfig(filename=log_file, level=logging.INFO, format='%(asctime)s - %(message)s',
-                        datefmt='%Y-%m-%d %H:%M:%S')
+    formatter = CachedTimeFormatter('%(asctime)s - %(message)s')
+    file_handler = AppendFileHandler(log_file)
+    file_handler.setFormatter(formatter)
     console = logging.StreamHandler()
     console.setLevel(logging.INFO)
-    formatter = logging.Formatter('%(asctime)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
     console.setFormatter(formatter)
-    logging.getLogger('').addHandler(console)
+
+    # Records are only queued by the synchronization, and written to the log file and to the
+    # console by a background thread, so that the synchronization never waits for those writes
+    log_queue = queue.SimpleQueue()
+    root_logger = logging.getLogger('')
+    root_logger.setLevel(logging.INFO)
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    listener = logging.handlers.QueueListener(log_queue, file_handler, console)
+    listener.start()
+    # Write any queued records before exiting
+    atexit.register(listener.stop)
+
+
+###########################################################################################
+#                                                                                         #
+# def file_digest(file_path, dir_fd=None)                                                 #
+#                                                                                         #
+# Function to compute a digest of the content of a file, used to compare files by content #
+# instead of by size and modification time. The file is hashed with hashlib.file_digest,  #
+# where available (Python 3.11+), which reads it into a single reusable buffer instead of #
+# creating a new bytes object for each chunk                                              #
+# Inputs: file_path (path to file, relative to dir_fd if given)                           #
+#         dir_fd (file descriptor of the folder containing the file, or None)             #
+# Output: digest of the file (prefixed with the name of the hash)                         #
+#                                                                                         #
+# Author: Solange Santos                                                                  #
+# Date: 14/10/2026                                                                        #
+#                                                                                         #
+###########################################################################################
+def file_digest(file_path, dir_fd=None):
+    with open(file_path, 'rb', opener=functools.partial(os.open, dir_fd=dir_fd)) as f:
+        if hasattr(hashlib, 'file_digest'):
+            digest = hashlib.file_digest(f, DIGEST_HASH)
+        else:
+            digest = DIGEST_HASH()
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+    return DIGEST_PREFIX + digest.hexdigest()
+
+
+###########################################################################################
+#                                                                                         #
+# def load_index(index_path)                                                              #
+#                                                                                         #
+# Function to load the state of the source folder saved by the last synchronization. A    #
+# missing, unreadable or malformed index file just means that there is no such state, in  #
+# which case the replica folder is fully compared against the source folder               #
+# Inputs: index_path (path to index file)                                                 #
+# Output: state of the source folder (see last_source_state)                              #
+#                                                                                         #
+# Author: Solange Santos                                                                  #
+# Date: 14/10/2026                                                                        #
+#                                                                                         #
+###########################################################################################
+def load_index(index_path):
+    try:
+        with open(index_path) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    # Each folder maps names to None (subfolders) or to a signature of files (size, mtime, mode
+    # and, optionally, digest); anything else (e.g. an index edited by hand) is ignored as a whole
+    if not isinstance(index, dict):
+        return {}
+    state = {}
+    for folder, entries in index.items():
+        if not isinstance(entries, dict):
+            return {}
+        state[folder] = {}
+        for name, signature in entries.items():
+            if signature is not None and not (isinstance(signature, list) and len(signature) in (3, 4)
+                                              and all(type(value) is int for value in signature[:3])
+                                              and all(isinstance(value, str) for value in signature[3:])):
+                return {}
+            state[folder][name] = None if signature is None else tuple(signature)
+
+    return state
+
+
+###########################################################################################
+#                                                                                         #
+# def save_index(index_path, state)                                                       #
+#                                                                                         #
+# Function to save the state of the source folder found by a synchronization. The index   #
+# file is replaced atomically, so that an interrupted save never leaves a truncated index #
+# behind. The temporary file is created with a unique name, so that it never overwrites a #
+# file of the replica folder (if left behind by a crash, it is removed as any other extra #
+# file of the replica folder)                                                             #
+# Inputs: index_path (path to index file)                                                 #
+#         state (state of the source folder, see last_source_state)                       #
+#                                                                                         #
+# Author: Solange Santos                                                                  #
+# Date: 14/10/2026                                                                        #
+#                                                                                         #
+###########################################################################################
+def save_index(index_path, state):
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(index_path), prefix=INDEX_FILE_NAME + '.')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(state, f, separators=(',', ':'))
+        os.replace(temp_path, index_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+###########################################################################################
+#                                                                                         #
+# def fast_rmtree(path, dir_fd=None)                                                      #
+#                                                                                         #
+# Function to remove a folder with all its content. Each folder is opened once and its    #
+# entries are removed relative to its file descriptor (with unlinkat), so that their      #
+# paths are never resolved again by the kernel, and a subfolder replaced by a symbolic    #
+# link meanwhile is never followed. The tree is walked with an explicit stack, so deep    #
+# trees can't hit the recursion limit. Where removal through file descriptors isn't       #
+# supported, shutil.rmtree is used                                                        #
+# Inputs: path (path to folder, relative to dir_fd if given)                              #
+#         dir_fd (file descriptor of the folder containing it, or None)                   #
+#                                                                                         #
+# Author: Solange Santos                                                                  #
+# Date: 14/10/2026                                                                        #
+#                                                                                         #
+###########################################################################################
+def fast_rmtree(path, dir_fd=None):
+    if not HAVE_DIR_FD:
+        shutil.rmtree(path)
+        return
+
+    flags = os.O_RDONLY | os.O_DIRECTORY | os.O_NOFOLLOW
+    root_fd = os.open(path, flags, dir_fd=dir_fd)
+    # Folders being emptied, as (file descriptor, name in parent folder, entries left) tuples
+    folders = [(root_fd, None, list(os.scandir(root_fd)))]
+    try:
+        while folders:
+            folder_fd, name, entries = folders[-1]
+            if entries:
+                entry = entries.pop()
+                if entry.is_dir(follow_symlinks=False):
+                    subfolder_fd = os.open(entry.name, flags, dir_fd=folder_fd)
+                    folders.append((subfolder_fd, entry.name, list(os.scandir(subfolder_fd))))
+                else:
+                    os.unlink(entry.name, dir_fd=folder_fd)
+            else:
+                # Folder is empty, so it can be removed from its parent folder
+                folders.pop()
+                os.close(folder_fd)
+                if folders:
+                    os.rmdir(name, dir_fd=folders[-1][0])
+    finally:
+        for folder_fd, name, entries in folders:
+            os.close(folder_fd)
+    os.rmdir(path, dir_fd=dir_fd)
+
+
+###########################################################################################
+#                                                                                         #
+# def remove_entry(path, is_dir, dir_fd=None, name=None)                                  #
+#                                                                                         #
+# Function to remove a file or a folder (with all its content) from the replica folder.   #
+# An entry which is already gone is ignored                                               #
+# Inputs: path (path to the file or folder)                                               #
+#         is_dir (whether it is a folder)                                                 #
+#         dir_fd (file descriptor of the folder containing it, or None to remove it by    #
+#                 its path)                                                               #
+#         name (name of the file or folder, used with dir_fd)                             #
+#                                                                                         #
+# Author: Solange Santos                                                                  #
+# Date: 14/10/2026                                                                        #
+#                                                                                         #
+###########################################################################################
+def remove_entry(path, is_dir, dir_fd=None, name=None):
+    target = path if dir_fd is None else name
+    try:
+        if is_dir:
+            fast_rmtree(target, dir_fd)
+            logger.info(f"Removed directory: {path}")
+        else:
+            os.unlink(target, dir_fd=dir_fd)
+            logger.info(f"Removed file: {path}")
+    except FileNotFoundError:
+        pass
+
+
+###########################################################################################
+#                                                                                         #
+# def update_mode(path, mode, dir_fd=None, name=None)                                     #
+#                                                                                         #
+# Function to change the permission bits of a file of the replica folder whose content is #
+# up to date (so that it doesn't need to be copied again). A file which is already gone   #
+# is ignored                                                                              #
+# Inputs: path (path to the file)                                                         #
+#         mode (permission bits of the source file)                                       #
+#         dir_fd (file descriptor of the folder containing it, or None to change it by    #
+#         its path)                                                                       #
+#         name (name of the file, used with dir_fd)                                       #
+#                                                                                         #
+# Author: Solange Santos                                                                  #
+# Date: 14/10/2026                                                                        #
+#                                                                                         #
+###########################################################################################
+def update_mode(path, mode, dir_fd=None, name=None):
+    try:
+        os.chmod(path if dir_fd is None else name, mode, dir_fd=dir_fd)
+        logger.info(f"Changed permissions of file: {path}")
+    except FileNotFoundError:
+        pass
+
+
+###########################################################################################
+#                                                                                         #
+# class BulkDirEntry                                                                      #
+#                                                                                         #
+# Class of the entries listed by getattrlistbulk, which behave like the ones of           #
+# os.scandir, except that their stat result is already known (except for symbolic links,  #
+# which are resolved when needed). As with os.scandir, the path of the entries of a       #
+# folder listed through its file descriptor is just their name                            #
+#                                                                                         #
+# Author: Solange Santos                                                                  #
+# Date: 14/10/2026                                                                        #
+#                                                                                         #
+###########################################################################################
+class BulkDirEntry:
+    __slots__ = ('name', 'path', '_dir_fd', '_type', '_stat')
+
+    def __init__(self, name, path, dir_fd, object_type, entry_stat):
+        self.name = name
+        self.path = path
+        self._dir_fd = dir_fd
+        self._type = object_type
+        self._stat = entry_stat
+
+    def is_dir(self, follow_symlinks=True):
+        if self._type == VLNK:
+            try:
+                return follow_symlinks and stat.S_ISDIR(self.stat().st_mode)
+            except OSError:
+                return False
+        return self._type == VDIR
+
+    def is_symlink(self):
+        return self._type == VLNK
+
+    def stat(self, follow_symlinks=True):
+        if self._type == VLNK:
+            return os.stat(self.path, dir_fd=self._dir_fd, follow_symlinks=follow_symlinks)
+        return self._stat
+
+
+###########################################################################################
+#                                                                                         #
+# def scan_folder(path, dir_fd=None)                                                      #
+#                                                                                         #
+# Function to list the entries of a folder. On macOS, os.scandir takes a stat per entry   #
+# when its stat result is needed, so getattrlistbulk is used instead, which returns the   #
+# name, type, size, times and permissions of many entries at once. Everywhere else (or if #
+# the filesystem doesn't support getattrlistbulk), os.scandir is used                     #
+# Inputs: path (path to folder)                                                           #
+#         dir_fd (file descriptor of the folder, listed instead of its path if given)     #
+# Output: list of entries (os.DirEntry or BulkDirEntry objects)                           #
+#                                                                                         #
+# Author: Solange Santos                                                                  #
+# Date: 14/10/2026                                                                        #
+#                                                                                         #
+###########################################################################################
+def scan_folder(path, dir_fd=None):
+    if libc is None or not hasattr(libc, 'getattrlistbulk'):
+        with os.scandir(path if dir_fd is None else dir_fd) as entries:
+            return list(entries)
+
+    attributes = AttrList(bitmapcount=ATTR_BIT_MAP_COUNT,
+                          commonattr=ATTR_CMN_RETURNED_ATTRS | ATTR_CMN_NAME | ATTR_CMN_OBJTYPE | ATTR_CMN_MODTIME |
+                          ATTR_CMN_ACCTIME | ATTR_CMN_ACCESSMASK,
+                          fileattr=ATTR_FILE_DATALENGTH)
+    buffer = ctypes.create_string_buffer(BULK_BUFFER_SIZE)
+    entries = []
+    folder_fd = os.open(path, DIR_OPEN_FLAGS) if dir_fd is None else dir_fd
+    try:
+        while True:
+            count = libc.getattrlistbulk(folder_fd, ctypes.byref(attributes), buffer, ctypes.c_size_t(BULK_BUFFER_SIZE),
+                                         ctypes.c_uint64(FSOPT_PACK_INVAL_ATTRS))
+            if count < 0:
+                error = ctypes.get_errno()
+                # Not supported by the filesystem
+                if error in (errno.ENOTSUP, errno.EINVAL) and not entries:
+                    with os.scandir(path if dir_fd is None else dir_fd) as scanned:
+                        return list(scanned)
+                raise OSError(error, os.strerror(error), path)
+            if count == 0:
+                return entries
+
+            offset = 0
+            for _ in range(count):
+                # Each entry is: u_int32_t length; attribute_set_t returned attributes; then the
+                # requested attributes, in order (packed at 4 bytes boundaries, since
+                # FSOPT_PACK_INVAL_ATTRS makes even invalid attributes present)
+                length, = struct.unpack_from('=I', buffer, offset)
+                name_offset = offset + 4 + 4 * ATTR_BIT_MAP_COUNT
+                name_start, name_length = struct.unpack_from('=iI', buffer, name_offset)
+                object_type, modified_sec, modified_nsec, accessed_sec, accessed_nsec, mode, size = \
+                    struct.unpack_from('=IqqqqIq', buffer, name_offset + 8)
+                name_start += name_offset
+                name = os.fsdecode(buffer[name_start:name_start + name_length].rstrip(b'\0'))
+                file_type = VNODE_FILE_TYPES.get(object_type, 0)
+                entry_stat = BulkStat(file_type | stat.S_IMODE(mode), size, accessed_sec * 10**9 + accessed_nsec,
+                                      modified_sec * 10**9 + modified_nsec)
+                entry_path = os.path.join(path, name) if dir_fd is None else name
+                entries.append(BulkDirEntry(name, entry_path, dir_fd, object_type, entry_stat))
+                offset += length
+    finally:
+        if dir_fd is None:
+            os.close(folder_fd)
+
+
+###########################################################################################
+#                                                                                         #
+# def needs_copy(replica_entry, source_stat, digest, recorded, replica_dir_fd=None)       #
+#                                                                                         #
+# Function to check if a file of the replica folder is outdated, in the same way as       #
+# rsync: a replica file with the same size and modification time as the source one is     #
+# considered up to date (or, if a digest is given, a replica file with the same size and  #
+# content), while a symbolic link (even to an up to date file) never is. While the        #
+# replica file keeps the size and modification time it was given by the last              #
+# synchronization, its digest is the one recorded back then, so it isn't read             #
+# Inputs: replica_entry (entry of the replica file, as found while scanning the replica   #
+#                        folder, or None if there is no such file)                        #
+#         source_stat (stat result of the source file, already taken while scanning it)   #
+#         digest (digest of the source file, or None to compare by modification time)     #
+#         recorded (state of the file recorded by the last synchronization, or None)      #
+#         replica_dir_fd (file descriptor the replica folder was listed through, or None) #
+# Output: True if the replica file is outdated                                            #
+#                                                                                         #
+# Author: Solange Santos                                                                  #
+# Date: 14/10/2026                                                                        #
+#                                                                                         #
+###########################################################################################
+def needs_copy(replica_entry, source_stat, digest, recorded, replica_dir_fd=None):
+    if replica_entry is None or replica_entry.is_dir(follow_symlinks=False) or replica_entry.is_symlink():
+        return True
+
+    replica_stat = replica_entry.stat(follow_symlinks=False)
+    if replica_stat.st_size != source_stat.st_size:
+        return True
+    if digest is None:
+        return replica_stat.st_mtime_ns != source_stat.st_mtime_ns
+    if (recorded is not None and len(recorded) == 4 and recorded[3].startswith(DIGEST_PREFIX)
+            and recorded[:2] == (replica_stat.st_size, replica_stat.st_mtime_ns)):
+        return recorded[3] != digest
+    return file_digest(replica_entry.path, replica_dir_fd) != digest
+
+
+###########################################################################################
+#                                                                                         #
+# def reflink_copy(source_fd, replica_fd, size)                                           #
+#                                                                                         #
+# Function to copy the content of a file by making the replica file a reflink of the      #
+# source file (sharing its blocks, on filesystems such as Btrfs or XFS), so that only     #
+# metadata is written                                                                     #
+# Inputs: source_fd (file descriptor of source file, open for reading)                    #
+#         replica_fd (file descriptor of replica file, open for writing)                  #
+#         size (number of bytes to copy)                                                  #
+#                                                                                         #
+# Author: Solange Santos                                                                  #
+# Date: 14/10/2026                                                                        #
+#                                                                                         #
+###########################################################################################
+def reflink_copy(source_fd, replica_fd, size):
+    if size > 0:
+        fcntl.ioctl(replica_fd, FICLONE, source_fd)
+
+
+###########################################################################################
+#                                                                                         #
+# def range_copy(source_fd, replica_fd, size)                                             #
+#                                                                                         #
+# Function to copy the content of a file with copy_file_range, within the kernel (which,  #
+# on some filesystems, shares the blocks of the file or copies it on the server side)     #
+# Inputs: source_fd (file descriptor of source file, open for reading)                    #
+#         replica_fd (file descriptor of replica file, open for writing)                  #
+#         size (number of bytes to copy)                                                  #
+#                                                                                         #
+# Author: Solange Santos                                                                  #
+# Date: 14/10/2026                                                                        #
+#                                                                                         #
+###########################################################################################
+def range_copy(source_fd, replica_fd, size):
+    remaining = size
+    while remaining > 0:
+        copied = os.copy_file_range(source_fd, replica_fd, remaining)
+        if copied == 0:
+            return
+        remaining -= copied
+
+
+###########################################################################################
+#                                                                                         #
+# def sendfile_copy(source_fd, replica_fd, size)                                          #
+#                                                                                         #
+# Function to copy the content of a file with sendfile, within the kernel (also between   #
+# different filesystems)                                                                  #
+# Inputs: source_fd (file descriptor of source file, open for reading)                    #
+#         replica_fd (file descriptor of replica file, open for writing)                  #
+#         size (number of bytes to copy)                                                  #
+#                                                                                         #
+# Author: Solange Santos                                                                  #
+# Date: 14/10/2026                                                                        #
+#                                                                                         #
+###########################################################################################
+def sendfile_copy(source_fd, replica_fd, size):
+    remaining = size
+    while remaining > 0:
+        copied = os.sendfile(replica_fd, source_fd, None, remaining)
+        if copied == 0:
+            return
+        remaining -= copied
+
+
+###########################################################################################
+#                                                                                         #
+# def buffered_copy(source_fd, replica_fd, size)                                          #
+#                                                                                         #
+# Function to copy the content of a file with a regular read/write loop, which tells the  #
+# kernel that the source file is read sequentially (so it reads ahead of the copy) and    #
+# drops the file from the page cache afterwards                                           #
+# Inputs: source_fd (file descriptor of source file, open for reading)                    #
+#         replica_fd (file descriptor of replica file, open for writing)                  #
+#         size (number of bytes to copy)                                                  #
+#                                                                                         #
+# Author: Solange Santos                                                                  #
+# Date: 14/10/2026                                                                        #
+#                                                                                         #
+###########################################################################################
+def buffered_copy(source_fd, replica_fd, size):
+    # The source file is read from start to end, so ask the kernel to read ahead of the copy
+    advise = getattr(os, 'posix_fadvise', None)
+    if advise:
+        try:
+            advise(source_fd, 0, size, os.POSIX_FADV_SEQUENTIAL)
+            advise(source_fd, 0, size, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            advise = None
+
+    remaining = size
+    buffer = memoryview(bytearray(LARGE_COPY_BUFFER_SIZE if size > LARGE_COPY_BUFFER_SIZE else COPY_BUFFER_SIZE))
+    while remaining > 0:
+        length = os.readv(source_fd, [buffer[:remaining]])
+        if not length:
+            break
+        remaining -= length
+        chunk = buffer[:length]
+        while chunk:
+            chunk = chunk[os.write(replica_fd, chunk):]
+
+    # The content of the source file won't be needed again, so don't keep it in the page cache
+    if advise:
+        advise(source_fd, 0, size, os.POSIX_FADV_DONTNEED)
+
+
+###########################################################################################
+#                                                                                         #
+# def reflink_supported(folder)                                                           #
+#                                                                                         #
+# Function to check if files of a folder can be reflinked, by reflinking a temporary file #
+# (created without a name, where supported) to another one                                #
+# Inputs: folder (path to folder)                                                         #
+# Output: True if reflinks are supported                                                  #
+#                                                                                         #
+# Author: Solange Santos                                                                  #
+# Date: 14/10/2026                                                                        #
+#                                                                                         #
+###########################################################################################
+def reflink_supported(folder):
+    try:
+        with tempfile.TemporaryFile(dir=folder) as source, tempfile.TemporaryFile(dir=folder) as replica:
+            source.write(b'\0')
+            source.flush()
+            fcntl.ioctl(replica.fileno(), FICLONE, source.fileno())
+    except OSError:
+        return False
+    return True
+
+
+###########################################################################################
+#                                                                                         #
+# def setup_backend(source_folder, replica_folder)                                        #
+#                                                                                         #
+# Function to choose, once, the methods used to copy the content of files, from what the  #
+# platform and the filesystems of the source and replica folders support: sendfile is     #
+# only used on Linux (other systems only send files to sockets), while reflinks and       #
+# copy_file_range are only used when both folders are on the same filesystem (and         #
+# reflinks only if a trial reflink succeeds). If the folders can't be probed, all the     #
+# methods supported by the platform are kept                                              #
+# Inputs: source_folder (path to source folder)                                           #
+#         replica_folder (path to replica folder, which doesn't have to exist yet)        #
+#                                                                                         #
+# Author: Solange Santos                                                                  #
+# Date: 14/10/2026                                                                        #
+#                                                                                         #
+###########################################################################################
+def setup_backend(source_folder, replica_folder):
+    global copy_methods
+
+    copy_methods = [method for method, supported in ((reflink_copy, FICLONE),
+                                                    (range_copy, hasattr(os, 'copy_file_range')),
+                                                    (sendfile_copy, sys.platform.startswith('linux')))
+                    if supported]
+    copy_methods.append(buffered_copy)
+
+    # Probe the closest existing folder of the replica folder, if it doesn't exist yet
+    probe_folder = os.path.abspath(replica_folder)
+    while not os.path.isdir(probe_folder) and os.path.dirname(probe_folder) != probe_folder:
+        probe_folder = os.path.dirname(probe_folder)
+    try:
+        same_filesystem = os.stat(source_folder).st_dev == os.stat(probe_folder).st_dev
+    except OSError:
+        return
+
+    if not same_filesystem:
+        copy_methods = [method for method in copy_methods if method not in (reflink_copy, range_copy)]
+    elif FICLONE and not reflink_supported(probe_folder):
+        copy_methods.remove(reflink_copy)
+
+
+###########################################################################################
+#                                                                                         #
+# def fast_copy(source_fd, replica_fd, size)                                              #
+#                                                                                         #
+# Function to copy the content of a file to another one, without reading it into user     #
+# space where possible: each of the methods chosen by setup_backend is tried in turn,     #
+# until one of them is supported for the given files (the last one, buffered_copy, always #
+# is)                                                                                     #
+# Inputs: source_fd (file descriptor of source file, open for reading)                    #
+#         replica_fd (file descriptor of replica file, open for writing)                  #
+#         size (number of bytes to copy)                                                  #
+#                                                                                         #
+# Author: Solange Santos                                                                  #
+# Date: 14/10/2026                                                                        #
+#                                                                                         #
+###########################################################################################
+def fast_copy(source_fd, replica_fd, size):
+    # Each method copies from the current file offsets, so a method failing midway is
+    # continued by the next one
+    for method in copy_methods[:-1]:
+        try:
+            method(source_fd, replica_fd, size)
+            return
+        except OSError as e:
+            if e.errno not in COPY_FALLBACK_ERRORS:
+                raise
+    copy_methods[-1](source_fd, replica_fd, size)
+
+
+###########################################################################################
+#                                                                                         #
+# def copy_file(source_path, replica_path, source_stat, name=None, source_dir_fd=None,    #
+#               replica_dir_fd=None)                                                      #
+#                                                                                         #
+# Function to copy a file from the source folder to the replica folder, together with its #
+# permission bits and access/modification times (as shutil.copy2 does, but reusing the    #
+# stat result of the source file instead of taking it again, and copying the content with #
+# fast_copy). If file descriptors of the source and replica folders are given, the files  #
+# are opened by their name relative to them                                               #
+# Inputs: source_path (path to source file)                                               #
+#         replica_path (path to replica file)                                             #
+#         source_stat (stat result of the source file, already taken while scanning it)   #
+#         name (name of the file, used with the file descriptors of the folders)          #
+#         source_dir_fd (file descriptor of the source folder, or None)                   #
+#         replica_dir_fd (file descriptor of the replica folder, or None)                 #
+#                                                                                         #
+# Author: Solange Santos                                                                  #
+# Date: 14/10/2026                                                                        #
+#                                                                                         #
+###########################################################################################
+def copy_file(source_path, replica_path, source_stat, name=None, source_dir_fd=None, replica_dir_fd=None):
+    if sys.platform == 'win32':
+        # Let Windows copy the file by itself
+        if not ctypes.windll.kernel32.CopyFileW(source_path, replica_path, False):
+            raise ctypes.WinError()
+        os.chmod(replica_path, stat.S_IMODE(source_stat.st_mode))
+        os.utime(replica_path, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns))
+    else:
+        source_target = source_path if source_dir_fd is None else name
+        replica_target = replica_path if replica_dir_fd is None else name
+        try:
+            source_fd = os.open(source_target, os.O_RDONLY | O_NOATIME, dir_fd=source_dir_fd)
+        except PermissionError:
+            # O_NOATIME is only allowed for the owner of the file
+            source_fd = os.open(source_target, os.O_RDONLY, dir_fd=source_dir_fd)
+        try:
+            replica_fd = os.open(replica_target, os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+                                 stat.S_IMODE(source_stat.st_mode), dir_fd=replica_dir_fd)
+            try:
+                fast_copy(source_fd, replica_fd, source_stat.st_size)
+
+                # Copy the permission bits and times through the open file, instead of looking
+                # up its path again
+                os.fchmod(replica_fd, stat.S_IMODE(source_stat.st_mode))
+                os.utime(replica_fd, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns))
+            finally:
+                os.close(replica_fd)
+        finally:
+            os.close(source_fd)
+    logger.info(f"Copied file: {source_path} to {replica_path}")
+
+
+###########################################################################################
+#                                                                                         #
+# def sync_single_folder(executor, source_dir, replica_dir, relative_dir, checksum,       #
+#                        full_compare, previous_state, current_state)                     #
+#                                                                                         #
+# Function to synchronize a single folder of the tree: files are copied (or, if only      #
+# their permission bits differ, just have them changed) and extra entries of the replica  #
+# folder are removed, while subfolders are submitted to the executor as new tasks (and so #
+# are the file copies, for folders with many files to copy). If the folder was already    #
+# synchronized (and neither are files compared by content nor is a full comparison        #
+# requested), the replica folder is assumed to still match the state of the source folder #
+# found back then, so only the changes since then are applied, without listing the        #
+# replica folder again. Where supported, the entries of both folders are accessed through #
+# file descriptors of the folders, opened once by the task, instead of resolving their    #
+# whole paths again                                                                       #
+# Inputs: executor (thread pool running the synchronization)                              #
+#         source_dir (path to source folder)                                              #
+#         replica_dir (path to replica folder)                                            #
+#         relative_dir (path of the folder, relative to the source folder)                #
+#         checksum (compare files by content instead of modification time)                #
+#         full_compare (compare the replica folder against the source folder, instead of  #
+#                       trusting the state found by the last synchronization)             #
+#         previous_state (state of the source folder found by the last synchronization)   #
+#         current_state (state of the source folder, filled in by this synchronization)   #
+# Output: list of futures of the tasks submitted to the executor                          #
+#                                                                                         #
+# Author: Solange Santos                                                                  #
+# Date: 14/10/2026                                                                        #
+#                                                                                         #
+###########################################################################################
+def sync_single_folder(executor, source_dir, replica_dir, relative_dir, checksum, full_compare, previous_state,
+                       current_state):
+    # File descriptors of the source and replica folders (see HAVE_DIR_FD), closed before
+    # returning, so that each running task keeps at most two of them open
+    source_fd = replica_fd = None
+    try:
+        # List source folder, which must exist
+        try:
+            if HAVE_DIR_FD:
+                source_fd = os.open(source_dir, DIR_OPEN_FLAGS)
+            source_entries = scan_folder(source_dir, source_fd)
+        except FileNotFoundError:
+            logger.error(f"Source folder '{source_dir}' does not exist.")
+            return []
+
+        # Entries of the source folder found by the last synchronization (None if not known). When
+        # files are compared by content, they are only used for the digests recorded back then
+        recorded_entries = previous_state.get(relative_dir) or {}
+        previous_entries = None if checksum or full_compare else previous_state.get(relative_dir)
+
+        # Ensure replica folder exists, create if not. Unless the last synchronization is known, an
+        # existing replica folder is listed once, up front: the listing tells which files are
+        # missing (so they are known to be outdated without a stat each) and which entries should
+        # be removed. In both cases, replica_is_dir tells, for each entry of the replica folder,
+        # whether it is a folder
+        replica_entries = {}
+        try:
+            os.makedirs(replica_dir)
+            logger.info(f"Created directory: {replica_dir}")
+            previous_entries = None
+            replica_is_dir = {}
+        except FileExistsError:
+            if previous_entries is None:
+                if HAVE_DIR_FD:
+                    replica_fd = os.open(replica_dir, DIR_OPEN_FLAGS)
+                replica_entries = {entry.name: entry for entry in scan_folder(replica_dir, replica_fd)}
+                replica_is_dir = {name: entry.is_dir(follow_symlinks=False) for name, entry in replica_entries.items()}
+            else:
+                replica_is_dir = {name: signature is None for name, signature in previous_entries.items()}
+
+        # Paths of the entries are built by concatenating their names to these prefixes (only when
+        # needed, since most files are usually up to date), instead of calling os.path.join for each
+        source_prefix = os.path.join(source_dir, '')
+        replica_prefix = os.path.join(replica_dir, '')
+        relative_prefix = os.path.join(relative_dir, '') if relative_dir else ''
+
+        # The index file name is reserved at the root of the replica folder
+        reserved_name = None if relative_dir else INDEX_FILE_NAME
+
+        subfolders = []
+        outdated_files = []
+        # Up to date files of the replica folder whose permission bits differ from the source
+        # ones, as (name, permission bits) tuples
+        changed_modes = []
+        # Entries of the replica folder replaced by an entry of another type in source, as (name,
+        # whether it is a folder) tuples, which must be removed before the new entry is synced
+        replaced = []
+        # State of the source folder, which also tells what should be removed from replica
+        state = {}
+
+        # Find the subfolders and the outdated files of the source folder (entry.path is relative
+        # to source_fd, when the folder was listed through it)
+        for entry in source_entries:
+            name = entry.name
+            if name == reserved_name:
+                continue
+
+            if entry.is_dir():
+                state[name] = None
+                # A file replaced by a folder in source must be removed from replica first
+                if replica_is_dir.get(name) is False:
+                    replaced.append((name, False))
+                subfolders.append(name)
+            else:
+                # Stat source once and reuse it for change detection and to copy the metadata
+                # (shutil.copy2 would stat it again)
+                source_stat = entry.stat()
+                # Special files (e.g. FIFOs, which would block the copy) can't be copied, so they
+                # are left out of the replica
+                if not stat.S_ISREG(source_stat.st_mode):
+                    logger.warning(f"Skipped special file: {source_prefix + name}")
+                    continue
+                mode = stat.S_IMODE(source_stat.st_mode)
+                signature = (source_stat.st_size, source_stat.st_mtime_ns, mode)
+                if previous_entries is not None:
+                    recorded = previous_entries.get(name)
+                    outdated = recorded is None or recorded[:2] != signature[:2]
+                    if not outdated:
+                        if recorded[2:3] != (mode,):
+                            changed_modes.append((name, mode))
+                        # Keep the digest recorded by a synchronization comparing files by content
+                        signature += tuple(recorded[3:4])
+                else:
+                    replica_entry = replica_entries.get(name)
+                    if checksum:
+                        digest = file_digest(entry.path, source_fd)
+                        outdated = needs_copy(replica_entry, source_stat, digest, recorded_entries.get(name),
+                                              replica_fd)
+                        signature += (digest,)
+                    else:
+                        outdated = needs_copy(replica_entry, source_stat, None, None)
+                        recorded = recorded_entries.get(name)
+                        if not outdated and recorded is not None and recorded[:2] == signature[:2]:
+                            # Keep the digest recorded by a synchronization comparing files by content
+                            signature += tuple(recorded[3:4])
+                    if not outdated and stat.S_IMODE(replica_entry.stat(follow_symlinks=False).st_mode) != mode:
+                        changed_modes.append((name, mode))
+                state[name] = signature
+                if outdated:
+                    # A folder replaced by a file in source must be removed from replica first, and
+                    # so must a symbolic link (which the copy would follow)
+                    if replica_is_dir.get(name):
+                        replaced.append((name, True))
+                    elif name in replica_entries and replica_entries[name].is_symlink():
+                        replaced.append((name, False))
+                    outdated_files.append((name, source_stat))
+
+        # Entries of the replica folder that are not in source (found as a set difference of the
+        # names, instead of checking every replica entry one by one)
+        removed = [(name, replica_is_dir[name]) for name in replica_is_dir.keys() - state.keys()
+                   if name != reserved_name]
+
+        # Open the replica folder only if something is changed in it
+        copy_inline = len(outdated_files) <= PARALLEL_THRESHOLD
+        if HAVE_DIR_FD and replica_fd is None and (replaced or removed or changed_modes or
+                                                   (outdated_files and copy_inline)):
+            replica_fd = os.open(replica_dir, DIR_OPEN_FLAGS)
+
+        for name, is_dir in replaced:
+            remove_entry(replica_prefix + name, is_dir, replica_fd, name)
+
+        futures = [executor.submit(sync_single_folder, executor, source_prefix + name, replica_prefix + name,
+                                   relative_prefix + name, checksum, full_compare, previous_state, current_state)
+                   for name in subfolders]
+
+        # Copy files from source folder to replica folder (the copies run by the executor may
+        # outlive the file descriptors of the folders, so they open the files by their paths)
+        if copy_inline:
+            for name, source_stat in outdated_files:
+                copy_file(source_prefix + name, replica_prefix + name, source_stat, name, source_fd, replica_fd)
+        else:
+            futures.extend(executor.submit(copy_file, source_prefix + name, replica_prefix + name, source_stat)
+                           for name, source_stat in outdated_files)
+
+        for name, mode in changed_modes:
+            update_mode(replica_prefix + name, mode, replica_fd, name)
+
+        # Remove any files in replica that are not in source
+        for name, is_dir in removed:
+            remove_entry(replica_prefix + name, is_dir, replica_fd, name)
+
+        current_state[relative_dir] = state
+        return futures
+    finally:
+        for dir_fd in (source_fd, replica_fd):
+            if dir_fd is not None:
+                os.close(dir_fd)
+
+
+###########################################################################################
+#                                                                                         #
+# def sync_tree(source_dir, replica_dir, relative_dir, checksum, full_compare,            #
+#               previous_state, current_state)                                            #
+#                                                                                         #
+# Function to synchronize a folder of the tree together with all its subfolders. Each     #
+# folder is synchronized by a separate task of a thread pool, which submits its           #
+# subfolders (and, for big folders, its file copies) as new tasks, so that the syscalls   #
+# of different folders and files overlap instead of waiting on each other                 #
+# Inputs: source_dir (path to source folder)                                              #
+#         replica_dir (path to replica folder)                                            #
+#         relative_dir (path of the folder, relative to the source folder)                #
+#         checksum (compare files by content instead of modification time)                #
+#         full_compare (compare the replica folder against the source folder, instead of  #
+#                       trusting the state found by the last synchronization)             #
+#         previous_state (state of the source folder found by the last synchronization)   #
+#         current_state (state of the source folder, filled in by this synchronization)   #
+#                                                                                         #
+# Author: Solange Santos                                                                  #
+# Date: 14/10/2026                                                                        #
+#                                                                                         #
+###########################################################################################
+def sync_tree(source_dir, replica_dir, relative_dir, checksum, full_compare, previous_state, current_state):
+    with concurrent.futures.ThreadPoolExecutor(max_workers=(os.cpu_count() or 1) * 2) as executor:
+        pending = {executor.submit(sync_single_folder, executor, source_dir, replica_dir, relative_dir, checksum,
+                                   full_compare, previous_state, current_state)}
+        while pending:
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                # Copy tasks don't submit anything, so their result is None
+                pending.update(future.result() or [])
 
 
 ###########################################################################################
 #                                                                                         #
-# def sync_folders(source_folder, replica_folder, log_file)                               #
+# def sync_folders(source_folder, replica_folder, log_file, checksum=False,               #
+#                  full_compare=False)                                                    #
 #                                                                                         #
 # Function to synchronize two folders (source and replica). The synchronization is done   #
 # in one-way: after the synchronization, content of the replica folder should be modified #
@@ -57,71 +1111,333 @@ def setup_logging(log_file):
 # Inputs: source_folder (path to source folder)                                           #
 #         replica_folder (path to replica folder)                                         #
 #         log_file (path to log file)                                                     #
+#         checksum (compare files by content instead of modification time)                #
+#         full_compare (compare the replica folder against the source folder, instead of  #
+#                       trusting the state found by the last synchronization)             #
 #                                                                                         #
 # Author: Solange Santos                                                                  #
 # Date: 14/04/2024                                                                        #
 #                                                                                         #
 ###########################################################################################
-def sync_folders(source_folder, replica_folder, log_file):
-    # Ensure source folder exists
-    if not os.path.exists(source_folder):
-        logging.error(f"Source folder '{source_folder}' does not exist.")
-        return
+def sync_folders(source_folder, replica_folder, log_file, checksum=False, full_compare=False):
+    global last_source_state
 
-    # Ensure replica folder exists, create if not
-    if not os.path.exists(replica_folder):
-        logging.info(f"Created directory: {replica_folder}")
-        os.makedirs(replica_folder)
-
-    # Get list of files in source folder
-    source_files = os.listdir(source_folder)
-
-    # Copy files from source folder to replica folder
-    for file_name in source_files:
-        source_path = os.path.join(source_folder, file_name)
-        replica_path = os.path.join(replica_folder, file_name)
-        if os.path.isdir(source_path):
-            sync_folders(source_path, replica_path, log_file)
-            # Doesn't need a log here because it will be performed in condition "if not os.path.exists(replica_folder)"
-            # when calling the function again
-            # logging.info(f"Created directory: {replica_path}")
-        else:
-            shutil.copy2(source_path, replica_path)
-            logging.info(f"Copied file: {source_path} to {replica_path}")
-
-    # Remove any files in replica that are not in source
-    for file_name in os.listdir(replica_folder):
-        file_path = os.path.join(replica_folder, file_name)
-        if file_name not in source_files:
-            if os.path.isdir(file_path):
-                shutil.rmtree(file_path)
-                logging.info(f"Removed directory: {file_path}")
-            else:
-                os.remove(file_path)
-                logging.info(f"Removed file: {file_path}")
+    index_path = os.path.join(replica_folder, INDEX_FILE_NAME)
+    if last_source_state is None:
+        last_source_state = load_index(index_path)
+    if copy_methods is None:
+        setup_backend(source_folder, replica_folder)
+    current_state = {}
+
+    sync_tree(source_folder, replica_folder, '', checksum, full_compare, last_source_state, current_state)
+
+    # Save the new state (unless the source folder is missing, in which case there is nothing
+    # to save, or nothing changed since the last synchronization)
+    if '' in current_state and current_state != last_source_state:
+        save_index(index_path, current_state)
+    last_source_state = current_state
 
 
 ###########################################################################################
 #                                                                                         #
-# def periodic_sync(sc, source_folder, replica_folder, log_file, interval)                #
+# def periodic_sync(sc, source_folder, replica_folder, log_file, interval, deadline, run, #
+#                   checksum=False)                                                       #
 #                                                                                         #
 # Function to allow another one (in the present case, the sync_folders one) to run        #
-# periodically, with a periodic interval specified                                        #
+# periodically, with a periodic interval specified. Each run is scheduled at an absolute  #
+# deadline on the monotonic clock, so the time the synchronization takes doesn't push the #
+# following ones later, and the runs missed while a synchronization took longer than the  #
+# interval are skipped instead of being run back to back. On the first run and then once  #
+# every FULL_COMPARE_INTERVALS runs, the replica folder is fully compared against the     #
+# source folder                                                                           #
 # Inputs: sc (scheduler object)                                                           #
 #         source_folder (path to source folder)                                           #
 #         replica_folder (path to replica folder)                                         #
 #         log_file (path to log file)                                                     #
 #         interval (value of the interval, in seconds, in which the synchronization       #
 #                   should be performed)                                                  #
+#         deadline (monotonic time at which this synchronization was scheduled)           #
+#         run (number of synchronizations run before this one)                            #
+#         checksum (compare files by content instead of modification time)                #
 #                                                                                         #
 # Author: Solange Santos                                                                  #
 # Date: 14/04/2024                                                                        #
 #                                                                                         #
 ###########################################################################################
-def periodic_sync(sc, source_folder, replica_folder, log_file, interval):
-    sync_folders(source_folder, replica_folder, log_file)
-    logging.info("Synchronization complete.")
-    sc.enter(interval, 1, periodic_sync, (sc, source_folder, replica_folder, log_file, interval))
+def periodic_sync(sc, source_folder, replica_folder, log_file, interval, deadline, run, checksum=False):
+    full_compare = run % FULL_COMPARE_INTERVALS == 0
+    sync_folders(source_folder, replica_folder, log_file, checksum, full_compare)
+    logger.info("Synchronization complete.")
+
+    # Schedule the next synchronization one interval after the deadline of this one, skipping
+    # the deadlines that have already passed
+    deadline += interval
+    now = time.monotonic()
+    if deadline < now:
+        deadline = deadline + ((now - deadline) // interval + 1) * interval if interval > 0 else now
+    sc.enterabs(deadline, 1, periodic_sync, (sc, source_folder, replica_folder, log_file, interval, deadline,
+                                             run + 1, checksum))
+
+
+###########################################################################################
+#                                                                                         #
+# def sync_path(source_folder, replica_folder, log_file, relative_path, checksum=False)   #
+#                                                                                         #
+# Function to synchronize a single entry (file or folder, with all its content) of the    #
+# source folder, which was reported as changed, updating the state of the last            #
+# synchronization accordingly (if the folder containing it was never synchronized, the    #
+# whole source folder is synchronized instead, unless that folder is gone from the source #
+# folder too, and if the folder containing it is gone from the replica folder, that       #
+# folder is synchronized again)                                                           #
+# Inputs: source_folder (path to source folder)                                           #
+#         replica_folder (path to replica folder)                                         #
+#         log_file (path to log file)                                                     #
+#         relative_path (path of the entry, relative to the source folder)                #
+#         checksum (compare files by content instead of modification time)                #
+# Output: list of the folders synchronized (by their path relative to the source folder), #
+#         or None if the whole source folder was synchronized                             #
+#                                                                                         #
+# Author: Solange Santos                                                                  #
+# Date: 14/10/2026                                                                        #
+#                                                                                         #
+###########################################################################################
+def sync_path(source_folder, replica_folder, log_file, relative_path, checksum=False):
+    relative_dir, name = os.path.split(relative_path)
+    entries = last_source_state.get(relative_dir)
+    if entries is None:
+        # A folder removed from source meanwhile is removed from replica by its own change
+        if not os.path.isdir(os.path.join(source_folder, relative_dir)):
+            return []
+        sync_folders(source_folder, replica_folder, log_file, checksum)
+        return None
+
+    # The index file name is reserved at the root of the replica folder
+    if not relative_dir and name == INDEX_FILE_NAME:
+        return []
+
+    source_path = os.path.join(source_folder, relative_path)
+    replica_path = os.path.join(replica_folder, relative_path)
+    try:
+        source_stat = os.stat(source_path)
+    except FileNotFoundError:
+        source_stat = None
+    if source_stat is not None and not (stat.S_ISDIR(source_stat.st_mode) or stat.S_ISREG(source_stat.st_mode)):
+        # Special files (e.g. FIFOs, which would block the copy) are left out of the replica
+        logger.warning(f"Skipped special file: {source_path}")
+        source_stat = None
+    if source_stat is None:
+        # Entry removed from source (together with the state of its subfolders, if a folder)
+        if name in entries:
+            if entries.pop(name) is None:
+                for folder in [folder for folder in last_source_state
+                               if folder == relative_path or folder.startswith(relative_path + os.sep)]:
+                    del last_source_state[folder]
+                remove_entry(replica_path, True)
+            else:
+                remove_entry(replica_path, False)
+        return []
+
+    if stat.S_ISDIR(source_stat.st_mode):
+        # A file replaced by a folder in source must be removed from replica first
+        if entries.get(name) is not None:
+            remove_entry(replica_path, False)
+        entries[name] = None
+        subtree_state = {}
+        sync_tree(source_path, replica_path, relative_path, checksum, False, last_source_state, subtree_state)
+        last_source_state.update(subtree_state)
+        return list(subtree_state)
+
+    # The replica file is assumed to still match the state recorded for it (including its
+    # digest, if files are compared by content)
+    try:
+        signature = (source_stat.st_size, source_stat.st_mtime_ns, stat.S_IMODE(source_stat.st_mode))
+        if checksum:
+            signature += (file_digest(source_path),)
+        recorded = entries.get(name)
+        if recorded is None or recorded[:2] != signature[:2] or (checksum and recorded[3:] != signature[3:]):
+            # A folder replaced by a file in source must be removed from replica first
+            if name in entries and recorded is None:
+                remove_entry(replica_path, True)
+            copy_file(source_path, replica_path, source_stat)
+            entries[name] = signature
+        elif recorded[2:3] != signature[2:3]:
+            # Only the permission bits changed (e.g. by chmod), keeping the digest recorded by a
+            # synchronization comparing files by content
+            update_mode(replica_path, signature[2])
+            entries[name] = signature[:3] + tuple(recorded[3:4])
+    except FileNotFoundError:
+        if not os.path.lexists(source_path):
+            # File removed from source meanwhile (its removal is reported next)
+            entries.pop(name, None)
+            remove_entry(replica_path, False)
+            return []
+
+        # The replica folder containing the file is gone (e.g. removed by something else), so
+        # that folder is synchronized again, which creates it and compares it fully
+        subtree_state = {}
+        sync_tree(os.path.join(source_folder, relative_dir), os.path.join(replica_folder, relative_dir), relative_dir,
+                  checksum, True, last_source_state, subtree_state)
+        last_source_state.update(subtree_state)
+        return list(subtree_state)
+    # Otherwise the recorded state is kept (with the digest recorded by a synchronization
+    # comparing files by content)
+    return []
+
+
+###########################################################################################
+#                                                                                         #
+# def add_watch(inotify_fd, watches, source_folder, relative_dir)                         #
+#                                                                                         #
+# Function to watch a folder of the source folder for changes (if the folder is already   #
+# watched, its path is just updated, since it may have been moved)                        #
+# Inputs: inotify_fd (file descriptor of inotify instance)                                #
+#         watches (path of each watched folder, relative to the source folder, by watch   #
+#         descriptor)                                                                     #
+#         source_folder (path to source folder)                                           #
+#         relative_dir (path of the folder, relative to the source folder)                #
+#                                                                                         #
+# Author: Solange Santos                                                                  #
+# Date: 14/10/2026                                                                        #
+#                                                                                         #
+###########################################################################################
+def add_watch(inotify_fd, watches, source_folder, relative_dir):
+    path = os.fsencode(os.path.join(source_folder, relative_dir))
+    wd = libc.inotify_add_watch(inotify_fd, path, WATCH_EVENTS | IN_ONLYDIR)
+    if wd < 0:
+        error = ctypes.get_errno()
+        # The folder may have been removed (or replaced by a file) meanwhile
+        if error in (errno.ENOENT, errno.ENOTDIR):
+            return
+        raise OSError(error, os.strerror(error), path)
+    watches[wd] = relative_dir
+
+
+###########################################################################################
+#                                                                                         #
+# def read_events(inotify_fd)                                                             #
+#                                                                                         #
+# Function to read the pending events of an inotify instance                              #
+# Inputs: inotify_fd (file descriptor of inotify instance)                                #
+# Output: list of events, as (watch descriptor, mask, name) tuples                        #
+#                                                                                         #
+# Author: Solange Santos                                                                  #
+# Date: 14/10/2026                                                                        #
+#                                                                                         #
+###########################################################################################
+def read_events(inotify_fd):
+    data = os.read(inotify_fd, 64 * 1024)
+    events = []
+    offset = 0
+    while offset < len(data):
+        # struct inotify_event: int wd; uint32_t mask, cookie, len; char name[len]
+        wd, mask, cookie, length = struct.unpack_from('iIII', data, offset)
+        offset += 16
+        events.append((wd, mask, os.fsdecode(data[offset:offset + length].rstrip(b'\0'))))
+        offset += length
+    return events
+
+
+###########################################################################################
+#                                                                                         #
+# def watch_sync(inotify_fd, source_folder, replica_folder, log_file, interval,           #
+# checksum=False)                                                                         #
+#                                                                                         #
+# Function to keep the replica folder synchronized by watching the source folder for      #
+# changes (with inotify), so that each changed entry is synchronized as soon as it        #
+# changes. The whole source folder is synchronized (fully comparing the replica folder    #
+# against it) at start and then once every WATCH_RECONCILE_INTERVALS intervals, in case   #
+# some change was missed                                                                  #
+# Inputs: inotify_fd (file descriptor of inotify instance)                                #
+#         source_folder (path to source folder)                                           #
+#         replica_folder (path to replica folder)                                         #
+#         log_file (path to log file)                                                     #
+#         interval (value of the interval, in seconds, in which the synchronization       #
+#         should be performed)                                                            #
+#         checksum (compare files by content instead of modification time)                #
+#                                                                                         #
+# Author: Solange Santos                                                                  #
+# Date: 14/10/2026                                                                        #
+#                                                                                         #
+###########################################################################################
+def watch_sync(inotify_fd, source_folder, replica_folder, log_file, interval, checksum=False):
+    index_path = os.path.join(replica_folder, INDEX_FILE_NAME)
+    watches = {}
+    while True:
+        # Synchronize the whole source folder, watching any folder which isn't watched yet. Each
+        # of these synchronizations is there to repair what the watched changes didn't cover (at
+        # start, what changed while the program wasn't running), so the replica folder is fully
+        # compared against the source folder
+        sync_folders(source_folder, replica_folder, log_file, checksum, True)
+        for relative_dir in last_source_state:
+            add_watch(inotify_fd, watches, source_folder, relative_dir)
+        logger.info("Synchronization complete.")
+
+        reconcile_time = time.monotonic() + interval * WATCH_RECONCILE_INTERVALS
+        overflow = False
+        while not overflow:
+            timeout = reconcile_time - time.monotonic()
+            if timeout <= 0 or not select.select([inotify_fd], [], [], timeout)[0]:
+                break
+
+            # Gather the changed entries for a little while
+            changed = set()
+            settle_time = time.monotonic() + WATCH_SETTLE_TIME
+            while True:
+                for wd, mask, name in read_events(inotify_fd):
+                    if mask & IN_Q_OVERFLOW:
+                        overflow = True
+                    elif mask & IN_IGNORED:
+                        watches.pop(wd, None)
+                    elif wd in watches and name:
+                        changed.add(os.path.join(watches[wd], name))
+                timeout = settle_time - time.monotonic()
+                if timeout <= 0 or not select.select([inotify_fd], [], [], timeout)[0]:
+                    break
+
+            # Events were lost, so the whole source folder must be synchronized again
+            if overflow:
+                break
+
+            # Parent folders come first, so that entries inside a changed folder find it already
+            # synchronized (or removed), in which case they are skipped
+            synced = set()
+            for relative_path in sorted(changed):
+                ancestor = os.path.dirname(relative_path)
+                while ancestor and ancestor not in synced:
+                    ancestor = os.path.dirname(ancestor)
+                if ancestor:
+                    continue
+                synced.add(relative_path)
+
+                synced_dirs = sync_path(source_folder, replica_folder, log_file, relative_path, checksum)
+                if synced_dirs is None:
+                    # The whole source folder was synchronized, which covers the rest of the changes
+                    for relative_dir in last_source_state:
+                        add_watch(inotify_fd, watches, source_folder, relative_dir)
+                    break
+                for relative_dir in synced_dirs:
+                    add_watch(inotify_fd, watches, source_folder, relative_dir)
+            if changed and '' in last_source_state:
+                save_index(index_path, last_source_state)
+
+
+###########################################################################################
+#                                                                                         #
+# def exit_on_signal(signum, frame)                                                       #
+#                                                                                         #
+# Function to exit when a signal is received (as on Ctrl+C, so that exit handlers still   #
+# run). Further signals are ignored meanwhile, so that they don't interrupt those         #
+# handlers                                                                                #
+# Inputs: signum (number of the signal)                                                   #
+#         frame (current stack frame)                                                     #
+#                                                                                         #
+# Author: Solange Santos                                                                  #
+# Date: 14/10/2026                                                                        #
+#                                                                                         #
+###########################################################################################
+def exit_on_signal(signum, frame):
+    signal.signal(signum, signal.SIG_IGN)
+    sys.exit(0)
 
 
 if __name__ == "__main__":
@@ -131,18 +1447,38 @@ if __name__ == "__main__":
     parser.add_argument('replica_folder', type=str, help='Path to the replica folder')
     parser.add_argument('log_file', type=str, help='Path to the log file')
     parser.add_argument('sync_interval', type=int, help='Synchronization interval in seconds')
+    parser.add_argument('--checksum', action='store_true',
+                        help='Compare files by content instead of size and modification time')
+    parser.add_argument('--watch', action='store_true',
+                        help='Synchronize changes as soon as they happen (Linux only), instead of only periodically')
     args = parser.parse_args()
 
     # Set up logging
     setup_logging(args.log_file)
 
-    # Create a scheduler object
-    scheduler = sched.scheduler(time.time, time.sleep)
+    # Exit on SIGTERM as on Ctrl+C, so that the queued log records are still written
+    signal.signal(signal.SIGTERM, exit_on_signal)
+
+    # Watch the source folder for changes, if requested and supported
+    inotify_fd = -1
+    if args.watch:
+        if libc is not None and hasattr(libc, 'inotify_init1'):
+            inotify_fd = libc.inotify_init1(IN_CLOEXEC)
+        if inotify_fd < 0:
+            logger.warning("Watching for changes isn't supported, synchronizing periodically instead.")
+    if inotify_fd >= 0:
+        watch_sync(inotify_fd, args.source_folder, args.replica_folder, args.log_file, args.sync_interval,
+                   args.checksum)
+    else:
+        # Create a scheduler object
+        scheduler = sched.scheduler(time.monotonic, time.sleep)
 
-    # Schedule the periodic synchronization
-    scheduler.enter(0, 1, periodic_sync, (scheduler, args.source_folder, args.replica_folder, args.log_file, args.sync_interval))
+        # Schedule the periodic synchronization
+        start = time.monotonic()
+        scheduler.enterabs(start, 1, periodic_sync, (scheduler, args.source_folder, args.replica_folder,
+                                                     args.log_file, args.sync_interval, start, 0, args.checksum))
 
-    # Run the scheduler
-    scheduler.run()
+        # Run the scheduler
+        scheduler.run()
 
     print("Folder synchronization completed.")